@@ -1,13 +1,38 @@
+import re
+from typing import Any, Dict
+
 import pytest
 import vcr
+from vcr.request import Request
 
 from decksite import APP
 from decksite.scrapers import mtggoldfish, tappedout
 from shared import configuration
 
+# Query parameters that change from run to run and would otherwise stop cassettes from matching.
+VOLATILE_PARAMS_RE = re.compile(r'(?<=[?&])(?:_|t|token|csrf)=[^&]*(?:&|$)')
+
+def scrub_request(request: Request) -> Request:
+    request.uri = VOLATILE_PARAMS_RE.sub('', request.uri).rstrip('?&')
+    request.headers.pop('User-Agent', None)
+    return request
+
+def scrub_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    for k in [k for k in response['headers'] if k.lower() == 'set-cookie']:
+        del response['headers'][k]
+    return response
+
+
+# Each test records to its own cassette and touches no shared state, so these can be run in parallel with pytest-xdist (`pytest -n auto`).
 TEST_VCR = vcr.VCR(
+    cassette_library_dir=configuration.get_optional_str('test_vcr_cassette_dir'),
     record_mode=configuration.get('test_vcr_record_mode'),
     path_transformer=vcr.VCR.ensure_suffix('.yaml'),
+    match_on=['method', 'scheme', 'host', 'port', 'path', 'query'],
+    filter_headers=['authorization', 'cookie'],
+    decode_compressed_response=True,
+    before_record_request=scrub_request,
+    before_record_response=scrub_response,
 )
 
 @pytest.mark.xfail(reason='Tappedout temporarily disabled due to rate limiting.')
@@ -15,13 +40,11 @@
 @pytest.mark.tappedout
 @pytest.mark.external
 @TEST_VCR.use_cassette
-def test_tappedout() -> None:
-    prev = APP.config['SERVER_NAME']
-    APP.config['SERVER_NAME'] = configuration.server_name()
+def test_tappedout(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(APP.config, 'SERVER_NAME', configuration.server_name())
     with APP.app_context():  # type: ignore
         # pylint: disable=no-member
         tappedout.ad_hoc()
-    APP.config['SERVER_NAME'] = prev
 
 @pytest.mark.functional
 @pytest.mark.tappedout
@@ -1,5 +1,3 @@
-from typing import Any
-
 from decksite.data.competition import Competition as Comp
 from decksite.view import View
 from shared import dtutil
@@ -21,9 +19,18 @@ def __init__(self, competition: Comp) -> None:
             self.has_leaderboard = True
         self.date = dtutil.display_date(competition.start_date)
         self.sponsor_name = competition.sponsor_name
+        self.expose_competition_fields()
+
+    def prepare(self) -> None:
+        super().prepare()
+        # prepare_competitions adds fields such as competition_ends to the competition that the templates expect on the view.
+        self.expose_competition_fields()
 
-    def __getattr__(self, attr: str) -> Any:
-        return getattr(self.competition, attr)
+    # Expose the competition's fields directly on the view for the templates, without overriding anything the view defines itself.
+    def expose_competition_fields(self) -> None:
+        for k, v in self.competition.items():
+            if k not in self.__dict__ and not hasattr(type(self), k):
+                setattr(self, k, v)
 
     def page_title(self) -> str:
         return self.competition.name
@@ -0,0 +1,22 @@
+import datetime
+
+import pytest
+
+from decksite.data import archetype
+from decksite.data.competition import Competition as Comp
+from decksite.main import APP
+from decksite.views.competition import Competition
+from shared import dtutil
+from shared_web import template
+
+
+def test_unfinished_league_subtitle(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(archetype, 'base_archetype_by_id', lambda: {})
+    monkeypatch.setattr(archetype, 'base_archetypes', lambda: [])
+    now = dtutil.now()
+    competition = Comp({'id': 1, 'name': 'League', 'type': 'League', 'start_date': now - datetime.timedelta(days=1), 'end_date': now + datetime.timedelta(days=7), 'decks': [], 'sponsor_name': None, 'competition_series_id': 1})
+    with APP.test_request_context('/competitions/1/'):
+        view = Competition(competition)
+        view.prepare()
+        assert view.competition_ends
+        assert f'Ends {view.competition_ends}' in template.render_name('subtitle', view)
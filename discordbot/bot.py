@@ -1,10 +1,13 @@
 import asyncio
 import datetime
+import functools
 import logging
 import re
 import subprocess
 import sys
-from typing import Any, Callable, Dict, List, Optional
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import discord
 from discord import Guild, Member, Role, VoiceState
@@ -17,15 +20,22 @@
 from github.GithubException import GithubException
 
 import discordbot.commands
-from discordbot import command
+from discordbot import command, emoji
 from magic import fetcher, multiverse, oracle, rotation, seasons, tournaments, whoosh_write
 from magic.models import Card
-from shared import configuration, dtutil, fetch_tools, perf
+from shared import configuration, dtutil, fetch_tools, lazy, perf
 from shared import redis_wrapper as redis
 from shared import repo
 from shared.container import Container
 
 TASKS = []
+ACHIEVEMENT_CACHE_TTL = 60 * 60
+ISSUE_QUEUE_SIZE = 100
+PD_GUILD_IDS = frozenset(int(guild_id) for guild_id in configuration.get_list('pd_guild_ids') if guild_id.strip())  # Add 226920619302715392 for the test server.
+_AMBIG_RE = re.compile(r'Ambiguous name for ([^\.]*)\. Suggestions: (.*)')
+_SUGG_RE = re.compile(r':[^:]*?: ([^:]*) ')
+_role_cache: Dict[int, Dict[str, Role]] = {}
+_person_data_inflight: Dict[int, 'asyncio.Future[Dict[str, Any]]'] = {}
 
 def background_task(func: Callable) -> Callable:
     async def wrapper(self: discord.Client) -> None:
@@ -41,8 +51,7 @@ async def wrapper(self: discord.Client) -> None:
 class Bot(commands.Bot):
     def __init__(self, **kwargs: Any) -> None:
         self.launch_time = perf.start()
-        commit_id = subprocess.check_output(['git', 'rev-parse', 'HEAD']).decode()
-        redis.store('discordbot:commit_id', commit_id)
+        redis.store('discordbot:commit_id', commit_id())
 
         help_command = commands.DefaultHelpCommand(dm_help=None, no_category='Commands')
         intents = discord.Intents.default()
@@ -54,15 +63,19 @@ def __init__(self, **kwargs: Any) -> None:
         super().load_extension('jishaku')
         self.voice = None
         self.achievement_cache: Dict[str, Dict[str, str]] = {}
+        self.issue_queue: 'asyncio.Queue[Tuple[str, Optional[BaseException], List[traceback.FrameSummary]]]' = asyncio.Queue(maxsize=ISSUE_QUEUE_SIZE)
+        self._achievement_cache_lock = asyncio.Lock()
+        self._achievement_cache_loaded_at = 0.0
         for task in TASKS:
             asyncio.ensure_future(task(self), loop=self.loop)
         discordbot.commands.setup(self)
 
     async def close(self) -> None:
         try:
-            p = await asyncio.create_subprocess_shell('git pull')
+            # Serial because pip installs from the requirements.txt that git pull may have just updated.
+            p = await asyncio.create_subprocess_exec('git', 'pull')
             await p.wait()
-            p = await asyncio.create_subprocess_shell(f'{sys.executable} -m pip install -U -r requirements.txt --no-cache')
+            p = await asyncio.create_subprocess_exec(sys.executable, '-m', 'pip', 'install', '-U', '-r', 'requirements.txt', '--no-cache')
             await p.wait()
         except Exception as c:  # pylint: disable=broad-except
             repo.create_issue('Bot error while closing', 'discord user', 'discordbot', 'PennyDreadfulMTG/perf-reports', exception=c)
@@ -88,15 +101,13 @@ async def on_message(self, message: Message) -> None:
             await command.respond_to_card_names(message, self)
 
     async def on_voice_state_update(self, member: Member, before: VoiceState, after: VoiceState) -> None:
-        # pylint: disable=unused-argument
         # If we're the only one left in a voice chat, leave the channel
-        guild = getattr(after.channel, 'guild', None)
-        if guild is None:
+        if after.channel is None and before.channel is None:
             return
-        voice = guild.voice_client
+        voice = member.guild.voice_client
         if voice is None or not voice.is_connected():
             return
-        if len(voice.channel.voice_members) == 1:
+        if len(voice.channel.members) == 1:
             await voice.disconnect()
 
     async def on_member_join(self, member: Member) -> None:
@@ -122,49 +133,62 @@ async def on_member_update(self, before: Member, after: Member) -> None:
         role = await get_role(before.guild, 'Linked Magic Online')
         if role and before.status == Status.offline and after.status == Status.online:
             data = None
-            # Linked to PDM
-            if role is not None and not role in before.roles:
-                if data is None:
-                    data = await fetcher.person_data_async(before.id)
-                if data.get('id', None):
-                    await after.add_roles(role)
-
+            needs_link = role not in before.roles
             key = f'discordbot:achievements:players:{before.id}'
-            if is_pd_server(before.guild) and not redis.get_bool(key) and not data:
-                data = await fetcher.person_data_async(before.id)
-                redis.store(key, True, ex=14400)
+            needs_trophies = is_pd_server(before.guild) and redis.store_if_absent(key, True, ex=14400)
+            if needs_link or needs_trophies:
+                try:
+                    data = await person_data(before.id)
+                except Exception:
+                    # Don't hold off the next attempt for four hours when we never got the data.
+                    if needs_trophies:
+                        redis.clear(key)
+                    raise
+            # Linked to PDM
+            if needs_link and data is not None and data.get('id', None):
+                await after.add_roles(role)
 
             # Trophies
             if is_pd_server(before.guild) and data is not None and data.get('achievements', None) is not None:
-                expected: List[Role] = []
-                remove: List[Role] = []
-
-                async def achievement_name(key: str) -> str:
-                    name = self.achievement_cache.get(key, None)
-                    if name is None:
-                        self.achievement_cache.update(await fetcher.achievement_cache_async())
-                        name = self.achievement_cache[key]
-                    return f'🏆 {name["title"]}'
-
-                for name, count in data['achievements'].items():
-                    if int(count) > 0:
-                        trophy = await achievement_name(name)
-                        role = await get_role(before.guild, trophy, create=True)
-                        if role is not None:
-                            expected.append(role)
-                for role in before.roles:
-                    if role in expected:
-                        expected.remove(role)
-                    elif '🏆' in role.name:
-                        remove.append(role)
-                await before.remove_roles(*remove)
-                await before.add_roles(*expected)
+                earned = [k for k, count in data['achievements'].items() if int(count) > 0]
+                if any(k not in self.achievement_cache for k in earned):
+                    await self.load_achievement_cache()
+                wanted_titles = {f'🏆 {self.achievement_cache[k]["title"]}' for k in earned if k in self.achievement_cache}
+                wanted = set((await ensure_roles(before.guild, wanted_titles)).values())
+                current_trophies = {r for r in before.roles if '🏆' in r.name}
+                # Only touch the trophy roles that differ so we can't clobber role changes made elsewhere while we were fetching.
+                await before.remove_roles(*(current_trophies - wanted))
+                await before.add_roles(*(wanted - current_trophies))
+
+    async def load_achievement_cache(self, force: bool = False) -> None:
+        # Concurrent callers wait on the lock and then find the cache already fresh, so a burst of member updates costs one fetch.
+        async with self._achievement_cache_lock:
+            if force or time.time() - self._achievement_cache_loaded_at > ACHIEVEMENT_CACHE_TTL:
+                self.achievement_cache = await fetcher.achievement_cache_async()
+                self._achievement_cache_loaded_at = time.time()
+
+    async def on_guild_emojis_update(self, guild: Guild, before: Any, after: Any) -> None:
+        # pylint: disable=unused-argument
+        emoji.clear_emoji_cache(guild.id)
+
+    async def on_guild_role_create(self, role: Role) -> None:
+        clear_role_cache(role.guild.id)
+
+    async def on_guild_role_update(self, before: Role, after: Role) -> None:
+        # pylint: disable=unused-argument
+        clear_role_cache(before.guild.id)
+
+    async def on_guild_role_delete(self, role: Role) -> None:
+        clear_role_cache(role.guild.id)
 
     async def on_guild_join(self, server: Guild) -> None:
+        greeting = "Hi, I'm mtgbot.  To look up cards, just mention them in square brackets. (eg `[Llanowar Elves] is better than [Elvish Mystic]`).\n" \
+            + "By default, I display Penny Dreadful legality. If you don't want or need that, just type `!notpenny`."
         for channel in server.text_channels:
+            if not channel.permissions_for(server.me).send_messages:
+                continue
             try:
-                await channel.send("Hi, I'm mtgbot.  To look up cards, just mention them in square brackets. (eg `[Llanowar Elves] is better than [Elvish Mystic]`).")
-                await channel.send("By default, I display Penny Dreadful legality. If you don't want or need that, just type `!notpenny`.")
+                await channel.send(greeting)
                 return
             except Forbidden:
                 pass
@@ -181,10 +205,10 @@ async def on_reaction_add(self, reaction: Reaction, author: Member) -> None:
                     pass
             elif c > 0 and 'Ambiguous name for ' in reaction.message.content and reaction.emoji in command.DISAMBIGUATION_EMOJIS_BY_NUMBER.values():
                 async with reaction.message.channel.typing():
-                    search = re.search(r'Ambiguous name for ([^\.]*)\. Suggestions: (.*)', reaction.message.content)
+                    search = _AMBIG_RE.search(reaction.message.content)
                     if search:
                         previous_command, suggestions = search.group(1, 2)
-                        card = re.findall(r':[^:]*?: ([^:]*) ', suggestions + ' ')[command.DISAMBIGUATION_NUMBERS_BY_EMOJI[reaction.emoji] - 1]
+                        card = _SUGG_RE.findall(suggestions + ' ')[command.DISAMBIGUATION_NUMBERS_BY_EMOJI[reaction.emoji] - 1]
                         # pylint: disable=protected-access
                         message = Container(content='!{c} {a}'.format(c=previous_command, a=card), channel=reaction.message.channel, author=author, reactions=[], _state=reaction.message._state)
                         await self.on_message(message)
@@ -193,11 +217,18 @@ async def on_reaction_add(self, reaction: Reaction, author: Member) -> None:
     async def on_error(self, event_method: str, *args: Any, **kwargs: Any) -> None:
         await super().on_error(event_method, args, kwargs)
         (_, exception, __) = sys.exc_info()
+        content = [arg.content for arg in args if hasattr(arg, 'content')]  # The default string representation of a Message does not include the message content.
+        self.queue_issue(f'Bot error {event_method}\n{args}\n{kwargs}\n{content}', exception)
+
+    # Reporting to GitHub is slow and blocking so hand it off to background_task_create_issues. During an error storm the oldest reports are dropped.
+    def queue_issue(self, content: str, exception: Optional[BaseException]) -> None:
+        # Capture the stack here, trimmed as create_issue would, so reports and their hashes don't depend on the executor thread.
+        item = (content, exception, traceback.extract_stack()[:-3])
         try:
-            content = [arg.content for arg in args if hasattr(arg, 'content')]  # The default string representation of a Message does not include the message content.
-            repo.create_issue(f'Bot error {event_method}\n{args}\n{kwargs}\n{content}', 'discord user', 'discordbot', 'PennyDreadfulMTG/perf-reports', exception=exception)
-        except GithubException as e:
-            logging.error('Github error\n%s', e)
+            self.issue_queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.issue_queue.get_nowait()
+            self.issue_queue.put_nowait(item)
 
     @background_task
     async def background_task_tournaments(self) -> None:
@@ -209,7 +240,7 @@ async def background_task_tournaments(self) -> None:
         if not isinstance(channel, discord.abc.Messageable):
             logging.warning('ERROR: could not find tournament_channel_id %d', tournament_channel_id)
             return
-        while self.is_ready:
+        while not self.is_closed():
             info = tournaments.next_tournament_info()
             diff = info['next_tournament_time_precise']
             if info['sponsor_name']:
@@ -261,7 +292,7 @@ async def background_task_league_end(self) -> None:
             logging.warning('tournament channel could not be found')
             return
 
-        while self.is_ready:
+        while not self.is_closed():
             try:
                 league = await fetch_tools.fetch_json_async(fetcher.decksite_url('/api/league'))
             except fetch_tools.FetchException as e:
@@ -314,7 +345,7 @@ async def background_task_rotation_hype(self) -> None:
         if not isinstance(channel, discord.abc.Messageable):
             logging.warning('rotation hype channel is not a text channel')
             return
-        while self.is_ready():
+        while not self.is_closed():
             until_rotation = seasons.next_rotation() - dtutil.now()
             last_run_time = rotation.last_run_time()
             if until_rotation < datetime.timedelta(7) and last_run_time is not None:
@@ -327,16 +358,59 @@ async def background_task_rotation_hype(self) -> None:
                 timer = int((until_rotation - datetime.timedelta(7)).total_seconds())
             await asyncio.sleep(timer)
 
+    @background_task
+    async def background_task_create_issues(self) -> None:
+        while not self.is_closed():
+            content, exception, stack = await self.issue_queue.get()
+            try:
+                await self.loop.run_in_executor(None, functools.partial(repo.create_issue, content, 'discord user', 'discordbot', 'PennyDreadfulMTG/perf-reports', exception=exception, stack=stack))
+            except GithubException as e:
+                logging.error('Github error\n%s', e)
+            except Exception as e:  # pylint: disable=broad-except
+                # Don't let a failure to report an error take down the reporter via on_error.
+                logging.error('Error creating issue\n%s', e)
+
+    @background_task
+    async def background_task_refresh_achievement_cache(self) -> None:
+        while not self.is_closed():
+            try:
+                await self.load_achievement_cache(force=True)
+            except fetch_tools.FetchException as e:
+                err = '; '.join(str(x) for x in e.args)
+                logging.error("Couldn't reach decksite or decode achievements json with error message(s) %s", err)
+                logging.info('Sleeping for 5 minutes and trying again.')
+                await asyncio.sleep(300)
+                continue
+            await asyncio.sleep(ACHIEVEMENT_CACHE_TTL)
+
     @background_task
     async def background_task_reboot(self) -> None:
         do_reboot_key = 'discordbot:do_reboot'
         if redis.get_bool(do_reboot_key):
             redis.clear(do_reboot_key)
-        while self.is_ready():
-            if redis.get_bool(do_reboot_key):
+        pubsub = None
+        while not self.is_closed():
+            if pubsub is None:
+                pubsub = redis.subscribe(redis.DISCORDBOT_REBOOT_CHANNEL)
+            if pubsub is not None:
+                try:
+                    # Blocks a worker thread, not the event loop, until a reboot is published or the timeout passes.
+                    message = await self.loop.run_in_executor(None, redis.get_message, pubsub, 60)
+                except ConnectionError:
+                    logging.warning('Lost connection to redis reboot channel, resubscribing')
+                    pubsub.close()
+                    pubsub = None
+                    message = None
+            else:
+                message = None
+                await asyncio.sleep(60)
+            # The do_reboot key is still honoured so that publishers from before the channel existed keep working.
+            if message is not None or redis.get_bool(do_reboot_key):
                 logging.info('Got request to reboot from redis')
+                if pubsub is not None:
+                    pubsub.close()
                 await self.logout()
-            await asyncio.sleep(60)
+                return
 
 def init() -> None:
     client = Bot()
@@ -349,26 +423,86 @@ def init() -> None:
     logging.info('Connecting to Discord')
     client.run(configuration.get_str('token'))
 
+# Read HEAD from .git directly rather than forking git, falling back to git itself for anything unusual.
+@lazy.lazy_property
+def commit_id() -> str:
+    try:
+        with open('.git/HEAD') as f:
+            head = f.read().strip()
+        if not head.startswith('ref: '):
+            return head
+        ref = head[len('ref: '):]
+        try:
+            with open(f'.git/{ref}') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            with open('.git/packed-refs') as f:
+                for line in f:
+                    if line.rstrip('\n').endswith(' ' + ref):
+                        return line.split(' ', 1)[0]
+    except OSError:
+        pass
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD']).decode().strip()
+
 def is_pd_server(guild: Guild) -> bool:
-    return guild.id == 207281932214599682  # or guild.id == 226920619302715392
+    return guild.id in PD_GUILD_IDS
+
+# Presence updates for the same user arrive in bursts (for example on reconnect), so concurrent callers share a single in-flight fetch.
+async def person_data(discord_id: int) -> Dict[str, Any]:
+    task = _person_data_inflight.get(discord_id)
+    if task is None:
+        task = asyncio.ensure_future(fetcher.person_data_async(discord_id))
+        _person_data_inflight[discord_id] = task
+        task.add_done_callback(lambda _: _person_data_inflight.pop(discord_id, None))
+    return await asyncio.shield(task)
 
 async def get_role(guild: Guild, rolename: str, create: bool = False) -> Optional[Role]:
-    for r in guild.roles:
-        if r.name == rolename:
-            return r
-    if create:
-        return await guild.create_role(name=rolename)
-    return None
+    role = roles_by_name(guild).get(rolename)
+    if role is None and create:
+        role = await guild.create_role(name=rolename)
+        roles_by_name(guild)[rolename] = role
+    return role
+
+async def ensure_roles(guild: Guild, rolenames: Iterable[str]) -> Dict[str, Role]:
+    roles = roles_by_name(guild)
+    names = set(rolenames)
+    missing = [name for name in names if name not in roles]
+    created = await asyncio.gather(*(guild.create_role(name=name) for name in missing))
+    roles.update(zip(missing, created))
+    return {name: roles[name] for name in names}
+
+def roles_by_name(guild: Guild) -> Dict[str, Role]:
+    roles = _role_cache.get(guild.id)
+    if roles is None:
+        roles = {}
+        for r in guild.roles:
+            roles.setdefault(r.name, r)
+        _role_cache[guild.id] = roles
+    return roles
+
+def clear_role_cache(guild_id: int) -> None:
+    _role_cache.pop(guild_id, None)
 
 async def rotation_hype_message() -> Optional[str]:
     rotation.clear_redis()
     runs, runs_percent, cs = rotation.read_rotation_files()
     runs_remaining = rotation.TOTAL_RUNS - runs
-    newly_legal = [c for c in cs if c.hit_in_last_run and c.hits == rotation.TOTAL_RUNS / 2]
-    newly_eliminated = [c for c in cs if not c.hit_in_last_run and c.status == 'Not Legal' and c.hits_needed == runs_remaining + 1]
-    newly_hit = [c for c in cs if c.hit_in_last_run and c.hits == 1]
-    num_undecided = len([c for c in cs if c.status == 'Undecided'])
-    num_legal_cards = len([c for c in cs if c.status == 'Legal'])
+    newly_legal: List[Card] = []
+    newly_eliminated: List[Card] = []
+    newly_hit: List[Card] = []
+    num_undecided = num_legal_cards = 0
+    for c in cs:
+        if c.status == 'Undecided':
+            num_undecided += 1
+        elif c.status == 'Legal':
+            num_legal_cards += 1
+        if c.hit_in_last_run:
+            if c.hits == rotation.TOTAL_RUNS / 2:
+                newly_legal.append(c)
+            if c.hits == 1:
+                newly_hit.append(c)
+        elif c.status == 'Not Legal' and c.hits_needed == runs_remaining + 1:
+            newly_eliminated.append(c)
     s = f'Rotation run number {runs} completed. Rotation is {runs_percent}% complete. {num_legal_cards} cards confirmed.'
     if not newly_hit + newly_legal + newly_eliminated and runs != 1 and runs % 5 != 0 and runs < rotation.TOTAL_RUNS / 2:
         return None  # Sometimes there's nothing to report
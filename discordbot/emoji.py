@@ -1,41 +1,55 @@
 import re
-from typing import Optional
+from typing import Dict, Match, Optional
 
-from discord import Client, Emoji
+from discord import Client, Emoji, Guild
 
 from magic import oracle, rotation
 from magic.models import Card
 from shared import redis_wrapper as redis
 
+_SYMBOL_RE = re.compile(r'\{([A-Z0-9/]{1,3})\}')
+_emoji_cache: Dict[int, Dict[str, Emoji]] = {}
+
 
 def find_emoji(emoji: str, client: Client) -> Optional[Emoji]:
     try:
         for guild in client.guilds:
-            emojis = guild.emojis
-            res = next((x for x in emojis if x.name == emoji), None)
+            res = emojis_by_name(guild).get(emoji)
             if res is not None:
                 return res
         return None
     except AttributeError:
         return None
 
+def emojis_by_name(guild: Guild) -> Dict[str, Emoji]:
+    emojis = _emoji_cache.get(guild.id)
+    if emojis is None:
+        emojis = {}
+        for e in guild.emojis:
+            emojis.setdefault(e.name, e)
+        _emoji_cache[guild.id] = emojis
+    return emojis
+
+def clear_emoji_cache(guild_id: int) -> None:
+    _emoji_cache.pop(guild_id, None)
+
 def replace_emoji(text: str, client: Client) -> str:
     if text is None:
         return ''
-    output = text
-    symbols = re.findall(r'\{([A-Z0-9/]{1,3})\}', text)
-    for symbol in symbols:
-        name = symbol
-        name = name.replace('/', '')
-        if len(name) == 1:
-            if re.fullmatch('[0-9]', name):
-                name = '0' + name
-            else:
-                name = name + name
-        emoji = find_emoji(name, client)
-        if emoji is not None:
-            output = output.replace('{' + symbol + '}', str(emoji))
-    return output
+
+    def replacer(m: Match) -> str:
+        emoji = find_emoji(_normalize(m.group(1)), client)
+        return str(emoji) if emoji is not None else m.group(0)
+    return _SYMBOL_RE.sub(replacer, text)
+
+def _normalize(symbol: str) -> str:
+    name = symbol.replace('/', '')
+    if len(name) == 1:
+        if name.isdigit():
+            name = '0' + name
+        else:
+            name = name + name
+    return name
 
 def info_emoji(c: Card, verbose: bool = False, show_legality: bool = True, no_rotation_hype: bool = False) -> str:
     s = ''
@@ -15,3 +15,12 @@ def test_info_emoji() -> None:
     assert r == ':white_check_mark::lady_beetle:'
     r = emoji.info_emoji(Container({'name': 'Force of Will', 'bugs': [{}]}), verbose=False, show_legality=True, no_rotation_hype=True)
     assert r == ':no_entry_sign::lady_beetle:'
+
+class FakeEmoji(Container):
+    def __str__(self) -> str:
+        return f'<:{self.name}:>'
+
+def test_replace_emoji() -> None:
+    client = Container({'guilds': [Container({'id': 1, 'emojis': [FakeEmoji({'name': 'WW'}), FakeEmoji({'name': '02'}), FakeEmoji({'name': 'WU'})]})]})
+    assert emoji.replace_emoji('{W}{2}{W/U}{X}', client) == '<:WW:><:02:><:WU:>{X}'
+    assert emoji.replace_emoji('No symbols here', client) == 'No symbols here'
@@ -10,5 +10,6 @@ def home() -> str:
 
 @APP.route('/reboot', methods=['POST'])
 def rotate() -> str:
-    redis.store('discordbot:do_reboot', True)
+    redis.publish(redis.DISCORDBOT_REBOOT_CHANNEL, True)
+    redis.store('discordbot:do_reboot', True)  # For bots that predate the reboot channel.
     return 'True'
@@ -9,13 +9,17 @@
 from magic.card import TableDescription
 from magic.database import create_table_def, db
 from magic.models import Card
-from shared import configuration, dtutil, repo
+from shared import configuration, dtutil
+from shared import redis_wrapper as redis
+from shared import repo
 from shared.database import sqlescape
 from shared.pd_exception import InvalidArgumentException, InvalidDataException
 
 # Database setup for the magic package. Mostly internal. To interface with what the package knows about magic cards use the `oracle` module.
 
 FORMAT_IDS: Dict[str, int] = {}
+# Incremented whenever the bugs in _cache_card may have changed so other processes know to drop their copies.
+BUGGED_CARDS_VERSION_KEY = 'magic:bugged_cards:version'
 
 def init() -> bool:
     event_loop = None
@@ -312,6 +316,7 @@ async def update_bugged_cards_async() -> None:
             continue
         db().execute('INSERT INTO card_bug (card_id, description, classification, last_confirmed, url, from_bug_blog, bannable) VALUES (%s, %s, %s, %s, %s, %s, %s)', [card_id, bug['description'], bug['category'], last_confirmed_ts, bug['url'], bug['bug_blog'], bug['bannable']])
     db().commit('update_bugged_cards')
+    redis.increment(BUGGED_CARDS_VERSION_KEY)
 
 async def update_pd_legality_async() -> None:
     for s in seasons.SEASONS:
@@ -461,6 +466,7 @@ def rebuild_cache() -> None:
     db().execute('CREATE TABLE IF NOT EXISTS _cache_card (_ INT)')  # Prevent error in RENAME TABLE below if bootstrapping.
     db().execute('RENAME TABLE _cache_card TO _old_cache_card, _new_cache_card TO _cache_card')
     db().execute('DROP TABLE IF EXISTS _old_cache_card')
+    redis.increment(BUGGED_CARDS_VERSION_KEY)
 
 def add_to_cache(ids: List[int]) -> None:
     if not ids:
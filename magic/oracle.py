@@ -5,6 +5,7 @@
 from magic.database import db
 from magic.models import Card, Printing
 from shared import configuration, fetch_tools, guarantee
+from shared import redis_wrapper as redis
 from shared.container import Container
 from shared.database import sqlescape
 from shared.pd_exception import (InvalidArgumentException, InvalidDataException,
@@ -14,6 +15,7 @@
 
 LEGAL_CARDS: List[str] = []
 CARDS_BY_NAME: Dict[str, Card] = {}
+BUGGED_CARDS: Dict[int, List[Card]] = {}
 
 def init(force: bool = False) -> None:
     if len(CARDS_BY_NAME) == 0 or force:
@@ -56,6 +58,15 @@ def cards_by_name() -> Dict[str, Card]:
     return CARDS_BY_NAME
 
 def bugged_cards() -> List[Card]:
+    version = redis.get_int(multiverse.BUGGED_CARDS_VERSION_KEY)
+    if version is None:
+        return load_bugged_cards()
+    if version not in BUGGED_CARDS:
+        BUGGED_CARDS.clear()
+        BUGGED_CARDS[version] = load_bugged_cards()
+    return BUGGED_CARDS[version]
+
+def load_bugged_cards() -> List[Card]:
     sql = multiverse.cached_base_query('bugs IS NOT NULL')
     rs = db().select(sql)
     return [Card(r) for r in rs]
@@ -6,18 +6,16 @@
 from github.Project import Project
 from github.Repository import Repository
 
-from shared import configuration, decorators
+from shared import decorators
 from shared import redis_wrapper as redis
+from shared import repo
 
 from . import strings
 
 ISSUE_CODES: Dict[int, str] = {}
 
-@decorators.memoize
 def get_github() -> Optional[Github]:
-    if not configuration.get_str('github_user') or not configuration.get_str('github_password'):
-        return None
-    return Github(configuration.get_str('github_user'), configuration.get_str('github_password'))
+    return repo.get_github()
 
 @decorators.memoize
 def get_repo() -> Optional[Repository]:
@@ -34,13 +32,15 @@ def create_comment(issue: Issue, body: str) -> IssueComment:
     return issue.create_comment(strings.remove_smartquotes(body))
 
 def set_issue_bbt(number: int, text: Optional[str]) -> None:
-    key = f'modobugs:bug_blog_text:{number}'
-    if text is None:
-        ISSUE_CODES.pop(number, None)
-        redis.clear(key)
-    else:
-        ISSUE_CODES[number] = text
-        redis.store(key, text, ex=1200)
+    set_issue_bbts({number: text})
+
+def set_issue_bbts(items: Dict[int, Optional[str]]) -> None:
+    for number, text in items.items():
+        if text is None:
+            ISSUE_CODES.pop(number, None)
+        else:
+            ISSUE_CODES[number] = text
+    redis.store_many({f'modobugs:bug_blog_text:{number}': text for number, text in items.items()}, ex=1200)
 
 def get_issue_bbt(issue: Issue) -> Optional[str]:
     key = f'modobugs:bug_blog_text:{issue.number}'
@@ -1,5 +1,5 @@
 import re
-from typing import List, Match, Optional
+from typing import Dict, List, Match, Optional
 
 import requests
 from bs4 import BeautifulSoup, Comment
@@ -174,28 +174,33 @@ def find_issue_by_code(code: str) -> Optional[Issue]:
         return None
 
     def scan(issue_list: List[Issue]) -> Optional[Issue]:
-        for issue in issue_list:
-            if not repo.is_issue_from_bug_blog(issue):
-                # Only bug blog issues have bug blog data
-                repo.set_issue_bbt(issue.number, None)
-                continue
-            icode = repo.get_issue_bbt(issue)
-            if icode == code:
-                return issue
-            if icode is not None:
-                continue
-            found = code in issue.body
-            if not found:
-                icode = find_bbt_in_body_or_comments(issue)
+        # Collect what we learn about each issue and write it all to redis in one go at the end.
+        bbts: Dict[int, Optional[str]] = {}
+        try:
+            for issue in issue_list:
+                if not repo.is_issue_from_bug_blog(issue):
+                    # Only bug blog issues have bug blog data
+                    bbts[issue.number] = None
+                    continue
+                icode = repo.get_issue_bbt(issue)
+                if icode == code:
+                    return issue
+                if icode is not None:
+                    continue
                 found = code in issue.body
-            if icode is not None:
-                repo.set_issue_bbt(issue.number, icode.strip())
-            else:
-                repo.set_issue_bbt(issue.number, None)
-            if found:
-                repo.set_issue_bbt(issue.number, code)
-                return issue
-        return None
+                if not found:
+                    icode = find_bbt_in_body_or_comments(issue)
+                    found = code in issue.body
+                if icode is not None:
+                    bbts[issue.number] = icode.strip()
+                else:
+                    bbts[issue.number] = None
+                if found:
+                    bbts[issue.number] = code
+                    return issue
+            return None
+        finally:
+            repo.set_issue_bbts(bbts)
     _repo = repo.get_repo()
     if _repo is None:
         return None
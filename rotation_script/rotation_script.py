@@ -147,7 +147,8 @@ def do_push() -> None:
 """
     print('Rebooting Discord bot...', flush=True)
     if redis.get_str('discordbot:commit_id'):
-        redis.store('discordbot:do_reboot', True)
+        redis.publish(redis.DISCORDBOT_REBOOT_CHANNEL, True)
+        redis.store('discordbot:do_reboot', True)  # For bots that predate the reboot channel.
         print('Done!', flush=True)
     else:
         checklist += '- [ ] restart discordbot\n'
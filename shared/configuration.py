@@ -16,6 +16,7 @@
     print("Couldn't load .env")
 
 RE_SUBKEY = re.compile(r'(\w+)\.(\w+)')
+PD_GUILD_ID = '207281932214599682'
 
 DEFAULTS: Dict[str, Any] = {
     # On production, /rotation/ turns off when not active.
@@ -51,7 +52,7 @@
     'flask_cookie_domain': None,
     'flask_server_name': None,
     # Discord server id.  Used for admin verification.  Used by decksite.
-    'guild_id': '207281932214599682',
+    'guild_id': PD_GUILD_ID,
     'image_dir': './images',
     'is_test_site': False,
     # Discord Webhook endpoint
@@ -73,6 +74,9 @@
     # Discord OAuth settings
     'oauth2_client_id': '',
     'oauth2_client_secret': '',
+    # Comma-separated discord server ids that get the Penny Dreadful specific bot behaviour (greetings, trophies).  Used by discordbot.
+    # Separate from guild_id because the bot may also treat a test server as PD; empty turns the behaviour off.
+    'pd_guild_ids': PD_GUILD_ID,
     'pdbot_api_token': lambda: ''.join(random.SystemRandom().choice(string.ascii_letters + string.digits) for _ in range(32)),
     'poeditor_api_key': None,
     'prevent_cards_db_updates': False,
@@ -82,6 +86,8 @@
     'redis_db': 0,
     'redis_enabled': True,
     'redis_host': 'localhost',
+    # Maximum number of simultaneous connections to redis per process.
+    'redis_pool_size': 20,
     'redis_port': 6379,
     # Discord channel id to emit rotation-in-progress messages to.
     'rotation_hype_channel_id': '207281932214599682',
@@ -93,7 +99,10 @@
     'slow_query': 5.0,
     'slow_bot_start': 30,
     'spellfix': './spellfix',
-    'test_vcr_record_mode': 'new_episodes',  # https://vcrpy.readthedocs.io/en/latest/usage.html#record-modes
+    # Directory for recorded HTTP interactions used by tests.  None means next to the test module, where the committed cassettes live.
+    'test_vcr_cassette_dir': None,
+    # https://vcrpy.readthedocs.io/en/latest/usage.html#record-modes  CI only replays the committed cassettes and never makes live requests.
+    'test_vcr_record_mode': lambda: 'none' if os.environ.get('CI') else 'new_episodes',
     'to_password': '',
     'to_username': '',
     'tournament_channel_id': '334220558159970304',
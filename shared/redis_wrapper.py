@@ -1,5 +1,5 @@
 import json
-from typing import Any, AnyStr, List, Optional, TypeVar
+from typing import Any, AnyStr, Dict, List, Optional, TypeVar
 
 import redis as redislib
 
@@ -7,15 +7,21 @@
 from .container import Container
 from .serialization import extra_serializer
 
+# Publishing anything to this channel asks the discord bot to reboot.
+DISCORDBOT_REBOOT_CHANNEL = 'discordbot:reboot'
+
 
 def init() -> Optional[redislib.Redis]:
     if not configuration.get_bool('redis_enabled'):
         return None
-    instance = redislib.Redis(
+    pool = redislib.BlockingConnectionPool(
         host=configuration.get_str('redis_host'),
         port=configuration.get_int('redis_port'),
         db=configuration.get_int('redis_db'),
+        max_connections=configuration.get_int('redis_pool_size'),
+        timeout=10,
     )
+    instance = redislib.Redis(connection_pool=pool)
     try:
         instance.ping()  # type: ignore
     except redislib.exceptions.ConnectionError:
@@ -106,6 +112,66 @@ def store(key: str, val: T, **kwargs: Any) -> T:
             pass
     return val
 
+# Stores every value in a single round trip.  A value of None clears that key instead.
+def store_many(vals: Dict[str, Any], **kwargs: Any) -> None:
+    p = pipeline()
+    if p is not None and vals:
+        try:
+            with p:
+                for key, val in vals.items():
+                    if val is None:
+                        p.delete(key)
+                    else:
+                        p.set(key, json.dumps(val, default=extra_serializer), **kwargs)
+                p.execute()
+        except redislib.exceptions.BusyLoadingError:
+            pass
+        except redislib.exceptions.ConnectionError:
+            pass
+
+# Returns False if key was already set, in which case it is left untouched (including its expiry).
+def store_if_absent(key: str, val: T, **kwargs: Any) -> bool:
+    if REDIS is not None:
+        try:
+            return REDIS.set(key, json.dumps(val, default=extra_serializer), nx=True, **kwargs) is not None
+        except redislib.exceptions.BusyLoadingError:
+            pass
+        except redislib.exceptions.ConnectionError:
+            pass
+    return True
+
+def pipeline() -> Optional[redislib.client.Pipeline]:
+    if REDIS is not None:
+        return REDIS.pipeline()
+    return None
+
+def publish(channel: str, val: T) -> None:
+    if REDIS is not None:
+        try:
+            REDIS.publish(channel, json.dumps(val, default=extra_serializer))
+        except redislib.exceptions.BusyLoadingError:
+            pass
+        except redislib.exceptions.ConnectionError:
+            pass
+
+def subscribe(*channels: str) -> Optional[redislib.client.PubSub]:
+    if REDIS is not None:
+        try:
+            pubsub = REDIS.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(*channels)
+            return pubsub
+        except redislib.exceptions.ConnectionError:
+            pass
+    return None
+
+# Blocking, so call it from an executor in async code.  Returns None on timeout.
+# Raises the builtin ConnectionError if the connection is lost. The PubSub will not recover by itself, so callers should close it and subscribe again.
+def get_message(pubsub: redislib.client.PubSub, timeout: float) -> Optional[Dict[str, Any]]:
+    try:
+        return pubsub.get_message(timeout=timeout)
+    except redislib.exceptions.ConnectionError as e:
+        raise ConnectionError('Lost connection to redis pubsub') from e
+
 def increment(key: str, **kwargs: Any) -> Optional[int]:
     if REDIS is not None:
         try:
@@ -2,6 +2,7 @@
 import hashlib
 import sys
 import textwrap
+import threading
 import traceback
 from typing import Dict, List, Optional
 
@@ -12,13 +13,31 @@
 
 from shared import configuration, dtutil
 
+THREAD_LOCAL = threading.local()
+
+# Reusing a client reuses its keep-alive connection, so we don't pay for a new TLS handshake on every call.
+# PyGithub's connection holds per-request state, so each thread gets its own client.
+def get_github() -> Optional[Github]:
+    gh_user = configuration.get_optional_str('github_user')
+    gh_pass = configuration.get_optional_str('github_password')
+    if not gh_user or not gh_pass:
+        return None
+    g = getattr(THREAD_LOCAL, 'github', None)
+    if g is None:
+        g = Github(gh_user, gh_pass, timeout=30, per_page=100, retry=3)
+        THREAD_LOCAL.github = g
+    return g
 
 # pylint: disable=too-many-locals
 def create_issue(content: str,
                  author: str,
                  location: str = 'Discord',
                  repo_name: str = 'PennyDreadfulMTG/Penny-Dreadful-Tools',
-                 exception: Optional[BaseException] = None) -> Optional[Issue.Issue]:
+                 exception: Optional[BaseException] = None,
+                 stack: Optional[List[traceback.FrameSummary]] = None) -> Optional[Issue.Issue]:
+    # Callers reporting from another thread should capture stack themselves, as the reporting thread's stack is meaningless and would change the hash.
+    if stack is None:
+        stack = traceback.extract_stack()[:-3]
     labels: List[str] = []
     issue_hash = None
     if content is None or content == '':
@@ -35,13 +54,11 @@ def create_issue(content: str,
         body += exception.__class__.__name__ + '\n'
         body += str(exception) + '\n'
         body += '</summary>\n\n'
-        stack = traceback.extract_stack()[:-3] + traceback.extract_tb(exception.__traceback__)
-        pretty = traceback.format_list(stack)
+        pretty = traceback.format_list(stack + traceback.extract_tb(exception.__traceback__))
         body += 'Stack Trace:\n\n```\n\nPython traceback\n\n' + ''.join(pretty) + '\n\n```\n\n</details>\n\n'
         issue_hash = hashlib.sha1(''.join(pretty).encode()).hexdigest()
         body += f'Exception_hash: {issue_hash}\n'
     elif repo_name == 'PennyDreadfulMTG/perf-reports':
-        stack = traceback.extract_stack()[:-3]
         pretty = traceback.format_list(stack)
         if request:
             pretty.append(request.full_path)
@@ -75,7 +92,9 @@ def create_issue(content: str,
     if not configuration.get_bool('create_github_issues'):
         print(f'Not creating github issue:\n{title}\n\n{body}')
         return None
-    g = Github(configuration.get_str('github_user'), configuration.get_str('github_password'))
+    g = get_github()
+    if g is None:
+        return None
     git_repo = g.get_repo(repo_name)
     if repo_name == 'PennyDreadfulMTG/perf-reports':
         labels.append(location)
@@ -107,11 +126,9 @@ def get_pull_requests(start_date: datetime.datetime,
                       max_pull_requests: int = sys.maxsize,
                       repo_name: str = 'PennyDreadfulMTG/Penny-Dreadful-Tools',
                       ) -> List[PullRequest.PullRequest]:
-    gh_user = configuration.get_optional_str('github_user')
-    gh_pass = configuration.get_optional_str('github_password')
-    if gh_user is None or gh_pass is None:
+    g = get_github()
+    if g is None:
         return []
-    g = Github(gh_user, gh_pass)
     git_repo = g.get_repo(repo_name)
     pulls: List[PullRequest.PullRequest] = []
     try: